@@ -1,175 +1,184 @@
-from flask import Flask, render_template, request, send_file
+from flask import Flask, jsonify, render_template, request, send_file
+import atexit
+import logging
+import logging.handlers
 import os
-import re
-from langchain_groq import ChatGroq
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
+import queue
+import secrets
+import tempfile
+import threading
+import jinja2
+from cachetools import TTLCache
 from io import BytesIO
-from xhtml2pdf import pisa
+from fpdf import FPDF
 
-app = Flask(__name__)
-
-# Initialize Groq API Key
-api_key = os.getenv("GROQ_API_KEY")
-if not api_key:
-    raise ValueError("❌ Groq API Key is missing! Set it in your Render environment variables.")
+import core
 
-# Groq AI Model Setup
-llm_restro = ChatGroq(model="mixtral-8x7b-32768", temperature=0.7, groq_api_key=api_key)
-
-# Function to calculate BMI
-def calculate_bmi(weight, height):
-    try:
-        weight = float(weight)
-        height = float(height)
-        return round(weight / (height ** 2), 2)  # BMI Formula
-    except ValueError:
-        return None
+app = Flask(__name__)
 
-# Function to categorize BMI
-def bmi_category(bmi):
-    if bmi < 18.5:
-        return "Underweight 🥺 – Time to bulk up!"
-    elif 18.5 <= bmi < 24.9:
-        return "Normal weight ✅ – Perfect balance!"
-    elif 25 <= bmi < 29.9:
-        return "Overweight 😅 – Let's shed a few!"
-    else:
-        return "Obese 😭 – Let's fix this ASAP!"
-
-# Define Prompt for AI
-prompt_template_resto = PromptTemplate(
-    input_variables=["age", "weight", "height", "gender", "veg_or_nonveg", "disease", "allergics", "foodtype", "bmi", "bmi_category"],
-    template="""
-    Hey! Based on your details:
-    - Age: {age}
-    - Weight: {weight}
-    - Height: {height}
-    - Gender: {gender}
-    - Dietary Preference: {veg_or_nonveg}
-    - Medical Condition: {disease}
-    - Allergies: {allergics}
-    - Food Type: {foodtype}
-    - BMI: {bmi} ({bmi_category})
-
-    Here’s your customized plan:
-
-    💖 **Daily Routine:**  
-    - [Give 3-5 fun and sassy routine suggestions]  
-
-    🍳 **Breakfast:**  
-    - [List 3-4 delicious but healthy breakfast options]  
-
-    🍽 **Dinner:**  
-    - [Suggest 3-4 tasty yet balanced dinner ideas]  
-
-    🏋️‍♀️ **Workout Plan:**  
-    - [List 3-4 exercises for your fitness goals]
-    """
-)
+# Templates: compiled once per worker and cached as bytecode, without per-render reload checks
+_JINJA_CACHE_DIR = os.path.join(tempfile.gettempdir(), "jinja_cache")
+os.makedirs(_JINJA_CACHE_DIR, exist_ok=True)
+app.config["TEMPLATES_AUTO_RELOAD"] = False
+app.jinja_env.auto_reload = False
+app.jinja_env.bytecode_cache = jinja2.FileSystemBytecodeCache(_JINJA_CACHE_DIR)
+for template in ("index.html", "result.html", "error.html"):
+    app.jinja_env.get_template(template)
+
+# Logging: records are queued and written to stderr by a background thread, off the request path.
+# The listener is started lazily and per process: a forked worker gets its own queue and thread.
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+_log_lock = threading.Lock()
+_log_pid = None
+_log_queue = None
+_log_listener = None
+
+# Function to return this process's log queue, (re)starting its listener after import or a fork
+def _current_log_queue():
+    global _log_pid, _log_queue, _log_listener
+    with _log_lock:
+        if _log_pid != os.getpid():
+            _log_pid = os.getpid()
+            _log_queue = queue.SimpleQueue()
+            _log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+            _log_listener.start()
+    return _log_queue
+
+# Function to flush and stop the listener at exit, if this process started one
+def _stop_log_listener():
+    with _log_lock:
+        if _log_pid == os.getpid():
+            _log_listener.stop()
+
+atexit.register(_stop_log_listener)
+
+# Queue handler that always writes to the current process's log queue
+class _ProcessQueueHandler(logging.handlers.QueueHandler):
+    def enqueue(self, record):
+        _current_log_queue().put_nowait(record)
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+logger.addHandler(_ProcessQueueHandler(None))
+logger.propagate = False
+
+# Recommendation results and their rendered PDFs, keyed by the token handed to the result page
+# These live in this process only: with several workers a download may land on one that doesn't
+# have the token, so the download form also posts the plan back and /download rebuilds from it.
+_RESULT_CACHE = TTLCache(maxsize=1024, ttl=3600)
+_PDF_BYTES_CACHE = TTLCache(maxsize=1024, ttl=3600)
+_PDF_CACHE_LOCK = threading.Lock()
 
 @app.route('/')
 def home():
     return render_template("index.html")
 
 @app.route('/recommend', methods=['POST'])
-def recommend():
+async def recommend():
     try:
-        data = request.form
-
-        # Extract Inputs
-        age = data.get("age", "").strip()
-        gender = data.get("gender", "").strip()
-        weight = data.get("weight", "").strip()
-        height = data.get("height", "").strip()
-        disease = data.get("disease", "").strip()
-        veg_or_nonveg = data.get("veg", "").strip()
-        allergic = data.get("allergics", "").strip()
-        food_type = data.get("foodtype", "").strip()
-
-        # Validate Inputs
-        if not all([age, gender, weight, height, disease, veg_or_nonveg, allergic, food_type]):
-            return render_template("error.html", message="⚠️ Missing required fields!"), 400
-
-        # Calculate BMI
-        bmi = calculate_bmi(weight, height)
-        if bmi is None:
-            return render_template("error.html", message="⚠️ Invalid weight or height format!"), 400
-
-        bmi_status = bmi_category(bmi)
-
-        # Prepare Input for AI
-        input_data = {
-            "age": age,
-            "weight": weight,
-            "height": height,
-            "bmi": bmi,
-            "bmi_category": bmi_status,
-            "gender": gender,
-            "veg_or_nonveg": veg_or_nonveg,
-            "disease": disease,
-            "allergics": allergic,
-            "foodtype": food_type
-        }
-
-        # Get AI Response
-        chain = LLMChain(llm=llm_restro, prompt=prompt_template_resto)
-        response = chain.run(input_data)
-
-        # Extract AI Recommendations
-        daily_routine = re.findall(r"💖\s*\*\*Daily Routine:\*\*\s*(.*?)(?=\n🍳|\Z)", response, re.DOTALL)
-        breakfast_items = re.findall(r"🍳\s*\*\*Breakfast:\*\*\s*(.*?)(?=\n🍽|\Z)", response, re.DOTALL)
-        dinner_items = re.findall(r"🍽\s*\*\*Dinner:\*\*\s*(.*?)(?=\n🏋️‍♀️|\Z)", response, re.DOTALL)
-        workout_plans = re.findall(r"🏋️‍♀️\s*\*\*Workout Plan:\*\*\s*(.*?)(?=\Z)", response, re.DOTALL)
+        result = await core.run_recommendation(request.form)
+
+        # Keep the result server-side so the PDF download only needs a short token
+        token = secrets.token_urlsafe(12)
+        with _PDF_CACHE_LOCK:
+            _RESULT_CACHE[token] = result
 
         # Render Result Page
-        return render_template(
-            "result.html",
-            bmi=bmi,
-            bmi_status=bmi_status,
-            daily_routine=daily_routine[0].strip().split('\n') if daily_routine else ["⚠ No routine suggestions!"],
-            breakfast_items=breakfast_items[0].strip().split('\n') if breakfast_items else ["⚠ No breakfast ideas!"],
-            dinner_items=dinner_items[0].strip().split('\n') if dinner_items else ["⚠ No dinner ideas!"],
-            workout_plans=workout_plans[0].strip().split('\n') if workout_plans else ["⚠ No workouts suggested!"]
-        )
+        return render_template("result.html", token=token, **result)
 
+    except core.RecommendationError as e:
+        return render_template("error.html", message=e.message), e.status
     except Exception as e:
-        print("❌ Error:", e)
+        logger.exception("❌ Error: %s", e)
         return render_template("error.html", message=f"⚠️ Something went wrong: {str(e)}"), 500
 
-@app.route('/download')
+# JSON frontend for the same recommendation, accepting a JSON body or form fields
+@app.route('/api/recommend', methods=['POST'])
+async def recommend_api():
+    try:
+        result = await core.run_recommendation(request.get_json(silent=True) or request.form)
+        return jsonify(result)
+
+    except core.RecommendationError as e:
+        return jsonify({"error": e.message}), e.status
+    except Exception as e:
+        logger.exception("❌ API Error: %s", e)
+        return jsonify({"error": f"⚠️ Something went wrong: {str(e)}"}), 500
+
+# ASCII stand-ins for common non-Latin-1 punctuation, so dropping the rest never changes words
+_PDF_PUNCT = str.maketrans({"‘": "'", "’": "'", "“": '"', "”": '"', "–": "-", "—": "-", "…": "...", "•": "-"})
+
+# Function to make text drawable with the core PDF fonts, which only cover Latin-1 (drops emoji)
+def pdf_text(text):
+    text = text.translate(_PDF_PUNCT).encode("latin-1", "ignore").decode("latin-1")
+    return " ".join(text.split())
+
+# Sections of the PDF: (heading, result name)
+_PDF_SECTIONS = (
+    ("Daily Routine Recommendations", "daily_routine"),
+    ("Recommended Breakfast", "breakfast_items"),
+    ("Recommended Dinner", "dinner_items"),
+    ("Recommended Workouts", "workout_plans"),
+)
+
+# Function to build the recommendations PDF
+def build_pdf(result):
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Helvetica", style="B", size=16)
+    pdf.cell(0, 10, "Diet & Workout Recommendations", align="C", new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font("Helvetica", size=12)
+    pdf.multi_cell(0, 8, pdf_text(f"BMI: {result['bmi']} | Category: {result['bmi_status']}"), new_x="LMARGIN", new_y="NEXT")
+
+    for title, name in _PDF_SECTIONS:
+        pdf.ln(4)
+        pdf.set_font("Helvetica", style="B", size=14)
+        pdf.cell(0, 10, title, new_x="LMARGIN", new_y="NEXT")
+        pdf.set_font("Helvetica", size=12)
+        for item in result[name]:
+            pdf.multi_cell(0, 8, pdf_text(item), new_x="LMARGIN", new_y="NEXT")
+
+    return bytes(pdf.output())
+
+# Function to rebuild a result from the plan posted back by the result page's download form
+def result_from_form(form):
+    if "bmi" not in form:
+        return None
+    result = {"bmi": form.get("bmi", ""), "bmi_status": form.get("bmi_status", "")}
+    for _, name in _PDF_SECTIONS:
+        result[name] = form.getlist(name)
+    return result
+
+@app.route('/download', methods=['GET', 'POST'])
 def download_pdf():
     try:
-        # Get data from request
-        bmi = request.args.get("bmi", "")
-        bmi_status = request.args.get("bmi_status", "")
-        daily_routine = request.args.getlist("daily_routine")
-        breakfast_items = request.args.getlist("breakfast_items")
-        dinner_items = request.args.getlist("dinner_items")
-        workout_plans = request.args.getlist("workout_plans")
-
-        # Render HTML to PDF
-        pdf_html = render_template(
-            "pdf_template.html",
-            bmi=bmi,
-            bmi_status=bmi_status,
-            daily_routine=daily_routine,
-            breakfast_items=breakfast_items,
-            dinner_items=dinner_items,
-            workout_plans=workout_plans
-        )
-
-        pdf_bytes = BytesIO()
-        pisa.CreatePDF(pdf_html, dest=pdf_bytes)
-        pdf_bytes.seek(0)
-
-        return send_file(pdf_bytes, as_attachment=True, download_name="Diet_Workout_Recommendations.pdf", mimetype="application/pdf")
+        # The token rides in the query string so a cache hit never has to parse the posted plan
+        token = request.args.get("token", "")
+        if not token:
+            return render_template("error.html", message="⚠️ Missing download token, please generate a new plan!"), 400
+
+        with _PDF_CACHE_LOCK:
+            pdf = _PDF_BYTES_CACHE.get(token)
+            result = _RESULT_CACHE.get(token)
+        if pdf is None and result is not None:
+            pdf = build_pdf(result)
+            with _PDF_CACHE_LOCK:
+                _PDF_BYTES_CACHE[token] = pdf
+        elif pdf is None:
+            # The posted plan comes from the client, so a PDF rebuilt from it is sent but never cached
+            result = result_from_form(request.form) if request.method == "POST" else None
+            if result is None:
+                return render_template("error.html", message="⚠️ Your plan has expired, please generate a new one!"), 404
+            pdf = build_pdf(result)
+
+        return send_file(BytesIO(pdf), as_attachment=True, download_name="Diet_Workout_Recommendations.pdf", mimetype="application/pdf")
 
     except Exception as e:
-        print("❌ PDF Error:", e)
+        logger.exception("❌ PDF Error: %s", e)
         return render_template("error.html", message="⚠️ Failed to generate PDF!"), 500
 
 # Run Flask App
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 10000))
-    app.run(host="0.0.0.0", port=port, debug=True)
+    app.run(host="0.0.0.0", port=port)
@@ -0,0 +1,288 @@
+import asyncio
+import bisect
+import json
+import os
+import threading
+from collections.abc import Mapping
+from functools import cache
+from cachetools import LRUCache
+from langchain_groq import ChatGroq
+
+# Groq AI Model Setup
+# Built lazily on first use so workers that never serve a recommendation skip client setup.
+# Prefer the low-latency 8B model; fall back to the larger 70B model if it errors.
+FAST_MODEL = "llama-3.1-8b-instant"
+FALLBACK_MODEL = "llama-3.3-70b-versatile"
+MAX_TOKENS = 400  # the whole plan fits well within this; caps runaway generations
+
+@cache
+def get_llm():
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise ValueError("❌ Groq API Key is missing! Set it in your Render environment variables.")
+
+    fast = ChatGroq(model=FAST_MODEL, temperature=0.7, max_tokens=MAX_TOKENS, groq_api_key=api_key)
+    fallback = ChatGroq(model=FALLBACK_MODEL, temperature=0.7, max_tokens=MAX_TOKENS, groq_api_key=api_key)
+    return fast.with_fallbacks([fallback])
+
+# Same models constrained to a JSON object response
+@cache
+def get_json_llm():
+    return get_llm().bind(response_format={"type": "json_object"})
+
+# Sections of the AI response in prompt order: (result name, JSON key, fallback shown when missing)
+_SECTIONS = (
+    ("daily_routine", "daily_routine", "⚠ No routine suggestions!"),
+    ("breakfast_items", "breakfast", "⚠ No breakfast ideas!"),
+    ("dinner_items", "dinner", "⚠ No dinner ideas!"),
+    ("workout_plans", "workout", "⚠ No workouts suggested!"),
+)
+
+# Function to read every section out of the AI's JSON plan
+def parse_plan(response):
+    try:
+        plan = json.loads(response)
+    except ValueError:
+        plan = None
+    if not isinstance(plan, dict):
+        plan = {}
+
+    result = {}
+    for name, key, default in _SECTIONS:
+        items = plan.get(key)
+        lines = [str(item).strip() for item in items if str(item).strip()] if isinstance(items, list) else []
+        result[name] = lines or [default]
+    return result
+
+# Function to check that the AI's reply holds every section of the plan as a non-empty list
+def check_plan(response):
+    try:
+        plan = json.loads(response)
+    except ValueError:
+        plan = None
+    if not isinstance(plan, dict):
+        raise ValueError("AI reply is not a JSON object")
+    for _, key, _ in _SECTIONS:
+        if not isinstance(plan.get(key), list) or not plan[key]:
+            raise ValueError(f"AI reply has no {key!r} list")
+    return response
+
+# BMI category thresholds and their messages
+_BMI_CUTS = (18.5, 24.9, 29.9)
+_BMI_MSGS = (
+    "Underweight 🥺 – Time to bulk up!",
+    "Normal weight ✅ – Perfect balance!",
+    "Overweight 😅 – Let's shed a few!",
+    "Obese 😭 – Let's fix this ASAP!",
+)
+
+# Function to calculate and categorize BMI
+def bmi_and_category(weight, height):
+    try:
+        w = float(weight)
+        h = float(height)
+        bmi = round(w / (h * h), 2)  # BMI Formula
+        return bmi, _BMI_MSGS[bisect.bisect_right(_BMI_CUTS, bmi)]
+    except (ValueError, ZeroDivisionError):
+        return None, None
+
+# Define Prompt for AI (filled with str.format_map from the prompt inputs)
+_PROMPT_FMT = """
+    Hey! Based on your details:
+    - Age: {age}
+    - Weight: {weight}
+    - Height: {height}
+    - Gender: {gender}
+    - Dietary Preference: {veg_or_nonveg}
+    - Medical Condition: {disease}
+    - Allergies: {allergics}
+    - Food Type: {foodtype}
+    - BMI: {bmi} ({bmi_category})
+
+    Here’s your customized plan. Respond ONLY with JSON, with no other text:
+    {{"daily_routine": [...], "breakfast": [...], "dinner": [...], "workout": [...]}}
+
+    - daily_routine: 3-5 fun and sassy routine suggestions
+    - breakfast: 3-4 delicious but healthy breakfast options
+    - dinner: 3-4 tasty yet balanced dinner ideas
+    - workout: 3-4 exercises for your fitness goals
+    """
+
+# Micro-batching of concurrent AI requests
+# Flask runs each async view on its own short-lived event loop, so the queue and
+# its worker live on a dedicated loop in a background thread shared by all requests.
+_BATCH_MAX_SIZE = 8
+_BATCH_MAX_WAIT = 0.02  # seconds to wait for more requests before flushing a batch
+_AI_TIMEOUT = 60  # seconds a request waits for its AI response before giving up
+
+# Started on first use, not at import, so a worker forked after preload (or one whose
+# batch worker stopped) gets a live loop of its own instead of a dead one
+_batch_lock = threading.Lock()
+_batch_pid = None
+_batch_loop = None
+_batch_queue = None
+_batch_worker = None  # future of the running batch_worker()
+
+async def batch_worker(queue):
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + _BATCH_MAX_WAIT
+        while len(batch) < _BATCH_MAX_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        try:
+            prompts = [_PROMPT_FMT.format_map(input_data) for input_data, _ in batch]
+            results = await get_json_llm().abatch(prompts, return_exceptions=True)
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+                continue
+            # A reply that breaks the schema fails its request, so it is never kept in the response cache
+            try:
+                future.set_result(check_plan(result.content))
+            except ValueError as e:
+                future.set_exception(e)
+
+async def _enqueue(queue, input_data):
+    future = asyncio.get_running_loop().create_future()
+    await queue.put((input_data, future))
+    return await future
+
+# Function to hand one prompt input to the batcher, (re)starting it when this process has none running
+def _submit(input_data):
+    global _batch_pid, _batch_loop, _batch_queue, _batch_worker
+    with _batch_lock:
+        if _batch_pid != os.getpid() or _batch_worker.done():
+            if _batch_pid == os.getpid():
+                _batch_loop.call_soon_threadsafe(_batch_loop.stop)
+            _batch_pid = os.getpid()
+            _batch_loop = asyncio.new_event_loop()
+            _batch_queue = asyncio.Queue()
+            threading.Thread(target=_batch_loop.run_forever, name="groq-batcher", daemon=True).start()
+            _batch_worker = asyncio.run_coroutine_threadsafe(batch_worker(_batch_queue), _batch_loop)
+        return asyncio.run_coroutine_threadsafe(_enqueue(_batch_queue, input_data), _batch_loop)
+
+# Cache of AI responses keyed by the prompt inputs (in _KEYS order)
+# The cached value is the pending batch future, so identical in-flight requests share one call.
+_KEYS = ("age", "weight", "height", "bmi", "bmi_category", "gender", "veg_or_nonveg", "disease", "allergics", "foodtype")
+_LLM_CACHE = LRUCache(maxsize=2048)
+_LLM_CACHE_LOCK = threading.Lock()
+
+# Function to check whether a cached AI call ended without a usable response
+def _failed(future):
+    return future.done() and (future.cancelled() or future.exception() is not None)
+
+# Function to get the cached AI call for these prompt inputs, starting one if needed
+def _cached_llm(key_tuple):
+    with _LLM_CACHE_LOCK:
+        future = _LLM_CACHE.get(key_tuple)
+        if future is None or _failed(future):
+            future = _submit(dict(zip(_KEYS, key_tuple)))
+            _LLM_CACHE[key_tuple] = future
+        return future
+
+# Function to drop one failed call from the cache, leaving every other entry warm
+def _evict(key_tuple, future):
+    with _LLM_CACHE_LOCK:
+        if _LLM_CACHE.get(key_tuple) is future:
+            _LLM_CACHE.pop(key_tuple)
+
+# Function to return an already finished AI response from the cache, without starting a call
+def _cached_response(key_tuple):
+    with _LLM_CACHE_LOCK:
+        future = _LLM_CACHE.get(key_tuple)
+    if future is not None and future.done() and not _failed(future):
+        return future.result()
+    return None
+
+async def run_cached(key_tuple):
+    future = _cached_llm(key_tuple)
+    try:
+        # Shield so one disconnecting (or timed out) client doesn't cancel the call for everyone sharing it
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), _AI_TIMEOUT)
+    except asyncio.TimeoutError:
+        _evict(key_tuple, future)
+        raise RecommendationError("⚠️ The AI is taking too long to answer, please try again!", 504)
+    except Exception:
+        _evict(key_tuple, future)
+        raise
+
+# Backpressure on the Groq endpoint: at most this many requests waiting on the AI at once
+_GROQ_MAX_CONCURRENCY = int(os.environ.get("GROQ_MAX_CONCURRENCY", 16))
+_GROQ_QUEUE_TIMEOUT = 30  # seconds to wait for a slot before answering 429
+_GROQ_SEM = threading.BoundedSemaphore(_GROQ_MAX_CONCURRENCY)
+_BUSY_MESSAGE = "⚠️ We're a little busy right now, please try again shortly!"
+
+# Raised when a recommendation can't be served; carries the message and HTTP status for the frontends
+class RecommendationError(Exception):
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+# Function to take one of the Groq slots, or fail with a 429 once the wait times out
+def acquire_groq_slot():
+    if not _GROQ_SEM.acquire(timeout=_GROQ_QUEUE_TIMEOUT):
+        raise RecommendationError(_BUSY_MESSAGE, 429)
+
+def release_groq_slot():
+    _GROQ_SEM.release()
+
+# Function to read one submitted field as stripped text (JSON bodies may carry numbers)
+def _field(data, name):
+    value = data.get(name)
+    return "" if value is None else str(value).strip()
+
+# Function to read and validate the submitted form or JSON body into the prompt inputs
+def read_profile(data):
+    if not isinstance(data, Mapping):
+        raise RecommendationError("⚠️ Send your details as a form or a JSON object!", 400)
+
+    age = _field(data, "age")
+    gender = _field(data, "gender")
+    weight = _field(data, "weight")
+    height = _field(data, "height")
+    disease = _field(data, "disease")
+    veg_or_nonveg = _field(data, "veg")
+    allergic = _field(data, "allergics")
+    food_type = _field(data, "foodtype")
+
+    # Validate Inputs
+    if not (age and gender and weight and height and disease and veg_or_nonveg and allergic and food_type):
+        raise RecommendationError("⚠️ Missing required fields!", 400)
+
+    # Calculate BMI
+    bmi, bmi_status = bmi_and_category(weight, height)
+    if bmi is None:
+        raise RecommendationError("⚠️ Invalid weight or height format!", 400)
+
+    # Prompt inputs, in _KEYS order
+    return dict(zip(_KEYS, (age, weight, height, bmi, bmi_status, gender, veg_or_nonveg, disease, allergic, food_type)))
+
+# Function to produce the full recommendation for a submitted form or JSON body
+async def run_recommendation(data):
+    profile = read_profile(data)
+
+    # Get AI Response (cache hits never reach Groq, so they don't wait for a slot)
+    key = tuple(profile.values())
+    response = _cached_response(key)
+    if response is None:
+        acquire_groq_slot()
+        try:
+            response = await run_cached(key)
+        finally:
+            release_groq_slot()
+
+    return {"bmi": profile["bmi"], "bmi_status": profile["bmi_category"], **parse_plan(response)}